@@ -1,40 +1,177 @@
+import argparse
+import heapq
+import shlex
+from array import array
+from collections import deque
+
 import networkx as nx
 import matplotlib.pyplot as plt
 import numpy as np
 
-def draw_circular_area(G, routers, pos, center, radius, color, label):
-    n = len(routers)
-    for i, router in enumerate(routers):
-        angle = 2 * np.pi * i / n
-        pos[router] = (center[0] + radius * np.cos(angle), center[1] + radius * np.sin(angle))
-        nx.draw_networkx_nodes(G, pos, nodelist=[router], node_size=700, node_color=color)
-        nx.draw_networkx_labels(G, pos, labels={router: router})
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# Graphs with at least this many routers use the compiled Dijkstra kernel even when
+# every edge weighs 1, since the breadth-first search runs in the interpreter.
+JIT_MIN_ROUTERS = 1000
+
+# Without numba, graphs with at least HIERARCHY_MIN_ROUTERS routers and at least
+# HIERARCHY_MIN_ROUTERS_PER_BOUNDARY routers per boundary router (one with a link into
+# another area) route inter-area queries over an overlay of boundary routers. The
+# overlay is built after HIERARCHY_MIN_QUERIES searches on an unchanged topology.
+HIERARCHY_MIN_ROUTERS = 1000
+HIERARCHY_MIN_ROUTERS_PER_BOUNDARY = 10
+HIERARCHY_MIN_QUERIES = 200
+
+# Number of (source, target) results Network.shortest_path remembers per topology version.
+SHORTEST_PATH_CACHE_SIZE = 1024
+
+def _dijkstra(indptr, indices, weights, source, target):
+    n = indptr.shape[0] - 1
+    dist = np.full(n, np.inf)
+    parent = np.full(n, -1, dtype=np.int32)
+    done = np.zeros(n, dtype=np.bool_)
+
+    # Binary heap with lazy deletion: every relaxation pushes once, so E + 1 slots suffice.
+    heap_dist = np.empty(indices.shape[0] + 1)
+    heap_node = np.empty(indices.shape[0] + 1, dtype=np.int32)
+    heap_dist[0] = 0.0
+    heap_node[0] = source
+    size = 1
+    dist[source] = 0.0
+
+    while size > 0:
+        d = heap_dist[0]
+        u = heap_node[0]
+        size -= 1
+        heap_dist[0] = heap_dist[size]
+        heap_node[0] = heap_node[size]
+        i = 0
+        while True:
+            child = 2 * i + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap_dist[child + 1] < heap_dist[child]:
+                child += 1
+            if heap_dist[i] <= heap_dist[child]:
+                break
+            heap_dist[i], heap_dist[child] = heap_dist[child], heap_dist[i]
+            heap_node[i], heap_node[child] = heap_node[child], heap_node[i]
+            i = child
+
+        if done[u]:
+            continue
+        done[u] = True
+        if u == target:
+            break
 
-    circle = plt.Circle(center, radius, color=color, alpha=0.2, zorder=0)
-    plt.gca().add_patch(circle)
-    plt.text(center[0], center[1], label, horizontalalignment='center', verticalalignment='center', fontsize=12, fontweight='bold')
+        for k in range(indptr[u], indptr[u + 1]):
+            v = indices[k]
+            candidate = d + weights[k]
+            if candidate < dist[v]:
+                dist[v] = candidate
+                parent[v] = u
+                i = size
+                heap_dist[i] = candidate
+                heap_node[i] = v
+                size += 1
+                while i > 0:
+                    up = (i - 1) // 2
+                    if heap_dist[up] <= heap_dist[i]:
+                        break
+                    heap_dist[i], heap_dist[up] = heap_dist[up], heap_dist[i]
+                    heap_node[i], heap_node[up] = heap_node[up], heap_node[i]
+                    i = up
+
+    if not done[target]:
+        return np.empty(0, dtype=np.int32)
+
+    length = 1
+    node = target
+    while node != source:
+        node = parent[node]
+        length += 1
+    path = np.empty(length, dtype=np.int32)
+    node = target
+    for i in range(length - 1, -1, -1):
+        path[i] = node
+        node = parent[node]
+    return path
+
+if njit is not None:
+    _dijkstra = njit(_dijkstra)
+
+def circular_positions(routers, center, radius):
+    n = len(routers)
+    angles = 2 * np.pi * np.arange(n) / n
+    coords = np.stack([center[0] + radius * np.cos(angles), center[1] + radius * np.sin(angles)], axis=1)
+    return dict(zip(routers, map(tuple, coords)))
+
+def draw_circular_area(G, routers, pos, center, radius, color, label, ax=None, outline=None):
+    # Returns the (circle, label) outline, which callers may pass back in to have it
+    # repositioned instead of recreated, and the node and label artists just drawn.
+    if ax is None:
+        ax = plt.gca()
+    nodes = nx.draw_networkx_nodes(G, pos, nodelist=routers, node_size=700, node_color=color, ax=ax)
+    labels = nx.draw_networkx_labels(G, pos, labels={router: router for router in routers}, ax=ax)
+
+    if outline is None:
+        circle = plt.Circle(center, radius, color=color, alpha=0.2, zorder=0)
+        ax.add_patch(circle)
+        text = ax.text(center[0], center[1], label, horizontalalignment='center', verticalalignment='center', fontsize=12, fontweight='bold')
+        outline = (circle, text)
+    else:
+        circle, text = outline
+        circle.set_center(center)
+        circle.set_radius(radius)
+        text.set_position(center)
+    return outline, [nodes, *labels.values()]
 
 class Router:
+    __slots__ = ('name', 'routing_table', '_get', '_shared', '_on_add')
+
     def __init__(self, name):
         self.name = name
         self.routing_table = {}
+        self._get = self.routing_table.get
+        self._shared = False
+        self._on_add = None
+
+    def share_routing_table(self, routing_table):
+        self.routing_table = routing_table
+        self._get = routing_table.get
+        self._shared = True
 
     def add_route(self, destination, next_hop):
+        if self._shared:
+            # Copy on write so the routers sharing this table are unaffected
+            self.routing_table = dict(self.routing_table)
+            self._get = self.routing_table.get
+            self._shared = False
         self.routing_table[destination] = next_hop
+        if self._on_add:
+            self._on_add(self, destination, next_hop)
 
     def get_next_hop(self, destination):
-        return self.routing_table.get(destination, None)
+        return self._get(destination)
 
     def __repr__(self):
         return f"Router({self.name})"
 
 class Area:
+    __slots__ = ('area_id', 'routers', 'network')
+
     def __init__(self, area_id):
         self.area_id = area_id
         self.routers = {}
+        self.network = None
 
     def add_router(self, router):
         self.routers[router.name] = router
+        if self.network:
+            self.network.index_router(router, self.area_id)
 
     def get_router(self, router_name):
         return self.routers.get(router_name, None)
@@ -42,60 +179,176 @@ class Area:
     def remove_router(self, router_name):
         if router_name in self.routers:
             del self.routers[router_name]
+            if self.network:
+                self.network.unindex_router(router_name)
 
     def __repr__(self):
         return f"Area({self.area_id})"
 
 class Network:
-    def __init__(self):
+    def __init__(self, figure_path=None):
         self.areas = {}
         self.area_border_routers = {}
+        self.router_index = {}
+        self._fwd = {}
         self.G = nx.DiGraph()
+        self.adj = {}
+        self._unit_weights = True
+        self._csr = None
+        self._dirty = True
+        self._version = 0
+        self._sp_cache = {}
+        self._sp_cache_version = 0
+        self._hierarchy = None
+        self._hierarchy_version = -1
+        self._hierarchy_queries = 0
+        self._pos_cache = None
+        self._pos_dirty = True
+
+        # visualize_network draws into one reused figure and saves it to
+        # figure_path when given, instead of showing it interactively.
+        self.figure_path = figure_path
+        self._fig = None
+        self._ax = None
+        self._area_patches = {}
+        self._drawn_artists = []
+
+        # Routing entries as parallel arrays of interned router ids, drained by
+        # visualize_network to add the edges of new routes.
+        self._names = []
+        self._ids = {}
+        self._route_src = array('i')
+        self._route_dst = array('i')
+        self._route_next_hop = array('i')
+        self._drawn_routes = 0
+
+    def index_router(self, router, area_id):
+        self.router_index[router.name] = (area_id, router)
+        router._on_add = self._route_added
+        for destination, next_hop in router.routing_table.items():
+            self._route_added(router, destination, next_hop)
+        self._fwd = {}
+        self._pos_dirty = True
+        self._version += 1
+
+    def unindex_router(self, router_name):
+        entry = self.router_index.pop(router_name, None)
+        if entry:
+            entry[1]._on_add = None
+        self._fwd = {}
+        self._pos_dirty = True
+        self._version += 1
+
+    def _intern(self, name):
+        node_id = self._ids.get(name)
+        if node_id is None:
+            node_id = self._ids[name] = len(self._names)
+            self._names.append(name)
+        return node_id
+
+    def _route_added(self, router, destination, next_hop):
+        self._route_src.append(self._intern(router.name))
+        self._route_dst.append(self._intern(destination))
+        self._route_next_hop.append(self._intern(next_hop))
+        self._fwd = {}
 
     def add_area(self, area):
+        # An area with the same id is replaced: its routers leave the index
+        replaced = self.areas.get(area.area_id)
+        if replaced is not None and replaced is not area:
+            replaced.network = None
+            for router_name in replaced.routers:
+                self.unindex_router(router_name)
         self.areas[area.area_id] = area
+        area.network = self
+        for router in area.routers.values():
+            self.index_router(router, area.area_id)
+        self._fwd = {}
+        self._dirty = True
+        self._version += 1
+        self._pos_dirty = True
 
     def remove_area(self, area_id):
         if area_id in self.areas:
-            del self.areas[area_id]
+            area = self.areas.pop(area_id)
+            area.network = None
+            for router_name in area.routers:
+                self.unindex_router(router_name)
             if area_id in self.area_border_routers:
                 del self.area_border_routers[area_id]
+            self._fwd = {}
+            self._dirty = True
+            self._version += 1
+            self._pos_dirty = True
 
     def add_area_border_router(self, router, area_id):
         if area_id not in self.area_border_routers:
             self.area_border_routers[area_id] = []
         self.area_border_routers[area_id].append(router)
+        self._fwd = {}
+        self._version += 1
+
+    def finalize(self):
+        # Routers whose routing tables hold the same entries in the same order share
+        # a single dict; Router.add_route copies it again before changing it.
+        groups = {}
+        for _, router in self.router_index.values():
+            groups.setdefault(tuple(router.routing_table.items()), []).append(router)
+        for routers in groups.values():
+            if len(routers) > 1:
+                routing_table = routers[0].routing_table
+                for router in routers:
+                    router.share_routing_table(routing_table)
+
+    def _index_border_routers(self, area_id):
+        # Maps each destination area to the border routers of area_id that have a
+        # route into it, in registration order.
+        by_dest_area = {}
+        for border_router in self.area_border_routers.get(area_id, ()):
+            for destination, next_hop in border_router.routing_table.items():
+                entry = self.router_index.get(destination)
+                if not entry or not next_hop:
+                    continue
+                reachable = by_dest_area.setdefault(entry[0], [])
+                if not reachable or reachable[-1] is not border_router:
+                    reachable.append(border_router)
+        return by_dest_area
+
+    def _forwarding_row(self, source_name):
+        # row[destination] holds what route_packet returns: the next hop inside an
+        # area, or (border router, next hop) across areas.
+        source_area_id, source_router = self.router_index[source_name]
+        by_dest_area = self._index_border_routers(source_area_id)
+        row = {}
+        for destination_name, (destination_area_id, _) in self.router_index.items():
+            if source_area_id == destination_area_id:
+                row[destination_name] = source_router.get_next_hop(destination_name)
+                continue
+            row[destination_name] = None
+            for border_router in by_dest_area.get(destination_area_id, ()):
+                next_hop = border_router.get_next_hop(destination_name)
+                if next_hop:
+                    row[destination_name] = (border_router.name, next_hop)
+                    break
+        self._fwd[source_name] = row
+        return row
+
+    def build_forwarding_tables(self):
+        # route_packet fills rows on demand, one per source router; this fills them all.
+        for source_name in self.router_index:
+            if source_name not in self._fwd:
+                self._forwarding_row(source_name)
+        return self._fwd
 
     def route_packet(self, source_router_name, destination_router_name):
-        source_router = None
-        source_area_id = None
-        destination_router = None
-        destination_area_id = None
-
-        for area_id, area in self.areas.items():
-            if source_router_name in area.routers:
-                source_router = area.routers[source_router_name]
-                source_area_id = area_id
-            if destination_router_name in area.routers:
-                destination_router = area.routers[destination_router_name]
-                destination_area_id = area_id
-
-        if not source_router or not destination_router:
-            return None
-
-        if source_area_id == destination_area_id:
-            return source_router.get_next_hop(destination_router_name)
-
-        for border_router in self.area_border_routers[source_area_id]:
-            next_hop = border_router.get_next_hop(destination_router_name)
-            if next_hop:
-                return border_router.name, next_hop
-
-        return None
+        row = self._fwd.get(source_router_name)
+        if row is None:
+            if source_router_name not in self.router_index:
+                return None
+            row = self._forwarding_row(source_router_name)
+        return row.get(destination_router_name)
 
     def visualize_network(self, path=None):
-        pos = {}
-
         # Define areas and their positions
         area_positions = {
             "Region 1": ((0, 4), 1.5),
@@ -112,45 +365,356 @@ class Network:
             "Region 5": 'purple'
         }
 
+        # Areas added at runtime are laid out in rows below the predefined ones
+        extra_areas = [area_id for area_id in self.areas if area_id not in area_positions]
+        for i, area_id in enumerate(extra_areas):
+            area_positions[area_id] = ((4 * (i % 3), -4 * (i // 3 + 1)), 1.5)
+            area_colors[area_id] = 'gray'
+
+        # Lay out nodes only when areas or routers changed since the last call
+        if self._pos_dirty or self._pos_cache is None:
+            pos = {}
+            for area_id, (center, radius) in area_positions.items():
+                if area_id in self.areas:
+                    pos.update(circular_positions(list(self.areas[area_id].routers), center, radius))
+            self._pos_cache = pos
+            self._pos_dirty = False
+        pos = self._pos_cache
+
+        # Add edges for routes registered since the last call
+        if self._drawn_routes < len(self._route_src):
+            start = self._drawn_routes
+            pairs = np.stack([np.array(self._route_src[start:], dtype=np.int32),
+                              np.array(self._route_next_hop[start:], dtype=np.int32)], axis=1)
+            names = self._names
+            edges = [(names[u], names[v]) for u, v in np.unique(pairs, axis=0).tolist()]
+            self.add_edges_from(edge for edge in edges if not self.G.has_edge(*edge))
+            self._drawn_routes = len(self._route_src)
+
+        # Reuse the figure until its window is closed. Area outlines stay on the
+        # axes between calls; nodes, labels and edges are removed and redrawn.
+        if self._fig is None or not plt.fignum_exists(self._fig.number):
+            self._fig, self._ax = plt.subplots()
+            self._area_patches = {}
+            self._drawn_artists = []
+        ax = self._ax
+        for artist in self._drawn_artists:
+            if artist.axes is not None:
+                artist.remove()
+        self._drawn_artists = []
+        for area_id in list(self._area_patches):
+            if area_id not in self.areas:
+                for artist in self._area_patches.pop(area_id):
+                    artist.remove()
+        ax.relim()
+
         # Draw areas and nodes
         for area_id, (center, radius) in area_positions.items():
             if area_id in self.areas:
-                routers = [router.name for router in self.areas[area_id].routers.values()]
-                draw_circular_area(self.G, routers, pos, center, radius, area_colors[area_id], area_id)
+                routers = list(self.areas[area_id].routers)
+                outline, artists = draw_circular_area(self.G, routers, pos, center, radius, area_colors[area_id],
+                                                      area_id, ax=ax, outline=self._area_patches.get(area_id))
+                self._area_patches[area_id] = outline
+                self._drawn_artists.extend(artists)
 
-        # Add edges
-        for area in self.areas.values():
-            for router in area.routers.values():
-                for destination, next_hop in router.routing_table.items():
-                    self.G.add_edge(router.name, next_hop)
-
-        nx.draw_networkx_edges(self.G, pos, arrowstyle='->', arrowsize=20)
+        # Edges of removed areas stay in the graph but have nowhere to be drawn
+        edges = [(u, v) for u, v in self.G.edges if u in pos and v in pos]
+        drawn = nx.draw_networkx_edges(self.G, pos, edgelist=edges, arrowstyle='->', arrowsize=20, ax=ax)
+        self._drawn_artists.extend(drawn if isinstance(drawn, list) else [drawn])
 
         if path:
-            path_edges = list(zip(path, path[1:]))
-            nx.draw_networkx_edges(self.G, pos, edgelist=path_edges, edge_color='r', width=2)
-
-        plt.title("Hierarchical Routing Network")
-        plt.axis('equal')
-        plt.show()
+            path_edges = [(u, v) for u, v in zip(path, path[1:]) if u in pos and v in pos]
+            drawn = nx.draw_networkx_edges(self.G, pos, edgelist=path_edges, edge_color='r', width=2, ax=ax)
+            self._drawn_artists.extend(drawn if isinstance(drawn, list) else [drawn])
+
+        ax.set_title("Hierarchical Routing Network")
+        ax.axis('equal')
+        if self.figure_path:
+            self._fig.savefig(self.figure_path)
+        else:
+            plt.show()
+
+    def apply_script(self, path):
+        # One command per line, arguments split like a shell (quote names with spaces):
+        #   add-region NAME
+        #   add-router REGION ROUTER [DEST=NEXT_HOP[,DEST=NEXT_HOP...] ...]
+        #   remove-region NAME
+        #   visualize
+        # Blank lines and lines starting with '#' are ignored.
+        with open(path) as script:
+            for line_number, line in enumerate(script, 1):
+                tokens = shlex.split(line, comments=True)
+                if not tokens:
+                    continue
+                command, args = tokens[0], tokens[1:]
+                if command == 'add-region' and len(args) == 1:
+                    self.add_area(Area(args[0]))
+                elif command == 'add-router' and len(args) >= 2:
+                    area = self.areas.get(args[0])
+                    if area is None:
+                        raise ValueError(f"{path}:{line_number}: unknown region {args[0]!r}")
+                    router = Router(args[1])
+                    for route in ",".join(args[2:]).split(","):
+                        if not route:
+                            continue
+                        destination, sep, next_hop = route.partition("=")
+                        if not sep:
+                            raise ValueError(f"{path}:{line_number}: expected DEST=NEXT_HOP, got {route!r}")
+                        router.add_route(destination, next_hop)
+                    area.add_router(router)
+                elif command == 'remove-region' and len(args) == 1:
+                    self.remove_area(args[0])
+                elif command == 'visualize' and not args:
+                    self.visualize_network()
+                else:
+                    raise ValueError(f"{path}:{line_number}: invalid command {line.strip()!r}")
 
     def add_edge(self, source, destination, weight=1):
+        if not self.G.has_edge(source, destination):
+            self.adj.setdefault(source, []).append(destination)
+            self.adj.setdefault(destination, [])
         self.G.add_edge(source, destination, weight=weight)
+        if weight != 1:
+            self._unit_weights = False
+        self._dirty = True
+        self._version += 1
+
+    def add_edges_from(self, edges, weight=1):
+        self.add_weighted_edges_from((source, destination, weight) for source, destination in edges)
+
+    def add_weighted_edges_from(self, edges):
+        # Inserting edge by edge lets has_edge catch repeats within the batch as well
+        G = self.G
+        adj = self.adj
+        for source, destination, weight in edges:
+            if not G.has_edge(source, destination):
+                adj.setdefault(source, []).append(destination)
+                adj.setdefault(destination, [])
+            G.add_edge(source, destination, weight=weight)
+            if weight != 1:
+                self._unit_weights = False
+        self._dirty = True
+        self._version += 1
+
+    def _to_csr(self):
+        # Built from self.G on demand: only the compiled kernel reads these arrays.
+        names = list(self.G)
+        ids = {name: i for i, name in enumerate(names)}
+        succ = self.G.succ
+        n_edges = self.G.number_of_edges()
+        indptr = np.zeros(len(names) + 1, dtype=np.int32)
+        np.cumsum(np.fromiter((len(succ[name]) for name in names), dtype=np.int32, count=len(names)),
+                  out=indptr[1:])
+        indices = np.fromiter((ids[neighbor] for name in names for neighbor in succ[name]),
+                              dtype=np.int32, count=n_edges)
+        weights = np.fromiter((data.get('weight', 1) for name in names for data in succ[name].values()),
+                              dtype=np.float32, count=n_edges)
+        return names, ids, indptr, indices, weights
+
+    def _jit_shortest_path(self, source, target):
+        if self._dirty or self._csr is None:
+            self._csr = self._to_csr()
+            self._dirty = False
+        names, ids, indptr, indices, weights = self._csr
+        if source not in ids:
+            raise nx.NodeNotFound(f"Source {source} is not in G")
+        if target not in ids:
+            raise nx.NetworkXNoPath(f"No path between {source} and {target}.")
+        path = _dijkstra(indptr, indices, weights, ids[source], ids[target])
+        if len(path) == 0:
+            raise nx.NetworkXNoPath(f"No path between {source} and {target}.")
+        return [names[i] for i in path]
 
     def shortest_path(self, source, target):
-        return nx.shortest_path(self.G, source=source, target=target, weight='weight')
+        if self._sp_cache_version != self._version:
+            self._sp_cache.clear()
+            self._sp_cache_version = self._version
+        key = (source, target)
+        path = self._sp_cache.get(key)
+        if path is None:
+            path = tuple(self._find_shortest_path(source, target))
+            if len(self._sp_cache) >= SHORTEST_PATH_CACHE_SIZE:
+                del self._sp_cache[next(iter(self._sp_cache))]
+            self._sp_cache[key] = path
+        return list(path)
+
+    def _build_hierarchy(self):
+        # Level 1: the areas; a graph node outside every area forms its own.
+        # Level 2: an overlay over boundary routers (endpoints of edges that cross areas)
+        # whose edges are the crossing edges plus intra-area shortest distances between
+        # boundary routers of the same area. A path can only leave an area through a
+        # crossing edge, so a search over the overlay finds exact shortest paths.
+        # Returns None when the overlay is too large a share of the graph to pay off.
+        area_of = {node: (None, node) for node in self.G}
+        for area_id, area in self.areas.items():
+            for name in area.routers:
+                if name in area_of:
+                    area_of[name] = area_id
+
+        crossing = [(u, v, weight) for u, v, weight in self.G.edges(data='weight', default=1)
+                    if area_of[u] != area_of[v]]
+        boundary = {}
+        for u, v, _ in crossing:
+            boundary.setdefault(area_of[u], set()).add(u)
+            boundary.setdefault(area_of[v], set()).add(v)
+        n_boundary = sum(len(nodes) for nodes in boundary.values())
+        if not crossing or n_boundary * HIERARCHY_MIN_ROUTERS_PER_BOUNDARY > self.G.number_of_nodes():
+            return None
 
-    def print_routing_table(self, router_name):
-        for area in self.areas.values():
-            if router_name in area.routers:
-                router = area.routers[router_name]
-                print(f"Routing Table for {router_name}:")
-                print(f"Dest\tNext Hop")
-                for destination, next_hop in router.routing_table.items():
-                    print(f"{destination}\t{next_hop}")
+        members = {}
+        for node, area_id in area_of.items():
+            if area_id in boundary:
+                members.setdefault(area_id, []).append(node)
+
+        # Cached rows per boundary router b: distances and predecessors from b to
+        # every router of its area, and from every router of its area to b.
+        rows_out = {}
+        rows_in = {}
+        overlay = {}
+        for area_id, nodes in boundary.items():
+            intra = self.G.subgraph(members[area_id]).copy()
+            reverse = intra.reverse(copy=False)
+            for node in nodes:
+                rows_out[node] = nx.dijkstra_predecessor_and_distance(intra, node, weight='weight')
+                rows_in[node] = nx.dijkstra_predecessor_and_distance(reverse, node, weight='weight')
+                lengths = rows_out[node][1]
+                overlay[node] = [(other, lengths[other]) for other in nodes if other != node and other in lengths]
+        for u, v, weight in crossing:
+            overlay[u].append((v, weight))
+
+        return area_of, boundary, rows_out, rows_in, overlay
+
+    def _hierarchical_path(self, hierarchy, source, target):
+        area_of, boundary, rows_out, rows_in, overlay = hierarchy
+
+        # Best distance found so far and the boundary router it entered the target area by
+        best = float('inf')
+        best_entry = None
+        dist = {}
+        parent = {}
+        heap = []
+        for node in boundary.get(area_of[source], ()):
+            d = rows_in[node][1].get(source)
+            if d is not None:
+                dist[node] = d
+                parent[node] = None
+                heapq.heappush(heap, (d, node))
+        target_boundary = boundary.get(area_of[target], ())
+        done = set()
+        while heap:
+            d, node = heapq.heappop(heap)
+            if d >= best:
+                break
+            if node in done:
+                continue
+            done.add(node)
+            if node in target_boundary:
+                remaining = rows_out[node][1].get(target)
+                if remaining is not None and d + remaining < best:
+                    best = d + remaining
+                    best_entry = node
+            for neighbor, weight in overlay[node]:
+                candidate = d + weight
+                if candidate < dist.get(neighbor, float('inf')):
+                    dist[neighbor] = candidate
+                    parent[neighbor] = node
+                    heapq.heappush(heap, (candidate, neighbor))
+
+        if best_entry is None:
+            raise nx.NetworkXNoPath(f"No path between {source} and {target}.")
+
+        overlay_path = []
+        node = best_entry
+        while node is not None:
+            overlay_path.append(node)
+            node = parent[node]
+        overlay_path.reverse()
+
+        # source -> first boundary router, walking the reverse row towards it
+        pred = rows_in[overlay_path[0]][0]
+        path = [source]
+        while path[-1] != overlay_path[0]:
+            path.append(pred[path[-1]][0])
+        for u, v in zip(overlay_path, overlay_path[1:]):
+            if area_of[u] != area_of[v]:
+                path.append(v)
+            else:
+                path.extend(self._walk_back(rows_out[u][0], u, v)[1:])
+        path.extend(self._walk_back(rows_out[best_entry][0], best_entry, target)[1:])
+        return path
+
+    @staticmethod
+    def _walk_back(pred, start, end):
+        path = [end]
+        while path[-1] != start:
+            path.append(pred[path[-1]][0])
+        path.reverse()
+        return path
+
+    def _current_hierarchy(self):
+        # The overlay only pays off against the interpreted flat search; the compiled
+        # kernel is about as fast per query and needs no build. It is built once
+        # HIERARCHY_MIN_QUERIES searches have hit the same topology, so that the build
+        # cost is spread over queries that would otherwise each search the whole graph.
+        if njit is not None or len(self.G) < HIERARCHY_MIN_ROUTERS:
+            return None
+        if self._hierarchy_version != self._version:
+            self._hierarchy = None
+            self._hierarchy_version = self._version
+            self._hierarchy_queries = 0
+        if self._hierarchy is None:
+            self._hierarchy_queries += 1
+            if self._hierarchy_queries >= HIERARCHY_MIN_QUERIES:
+                # An empty tuple records that the overlay was not worth building
+                self._hierarchy = self._build_hierarchy() or ()
+        return self._hierarchy or None
+
+    def _find_shortest_path(self, source, target):
+        if source in self.G and target in self.G:
+            hierarchy = self._current_hierarchy()
+            # Routes within one area go to the flat search, which may also leave the area
+            if hierarchy is not None and hierarchy[0][source] != hierarchy[0][target]:
+                return self._hierarchical_path(hierarchy, source, target)
+        return self._flat_shortest_path(source, target)
+
+    def _flat_shortest_path(self, source, target):
+        if njit is not None and (not self._unit_weights or len(self.adj) >= JIT_MIN_ROUTERS):
+            return self._jit_shortest_path(source, target)
+        if not self._unit_weights:
+            return nx.shortest_path(self.G, source=source, target=target, weight='weight')
+        if source not in self.adj:
+            raise nx.NodeNotFound(f"Source {source} is not in G")
+
+        # Every edge weighs 1, so a breadth-first search already finds the shortest path.
+        parent = {source: None}
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            if node == target:
+                path = []
+                while node is not None:
+                    path.append(node)
+                    node = parent[node]
+                return path[::-1]
+            for neighbor in self.adj[node]:
+                if neighbor not in parent:
+                    parent[neighbor] = node
+                    queue.append(neighbor)
+
+        raise nx.NetworkXNoPath(f"No path between {source} and {target}.")
 
-def menu():
-    network = Network()
+    def print_routing_table(self, router_name):
+        entry = self.router_index.get(router_name)
+        if not entry:
+            return
+        _, router = entry
+        print(f"Routing Table for {router_name}:")
+        print(f"Dest\tNext Hop")
+        for destination, next_hop in router.routing_table.items():
+            print(f"{destination}\t{next_hop}")
+
+def build_network(figure_path=None):
+    network = Network(figure_path)
 
     # Create routers
     router_1a = Router("1A")
@@ -303,57 +867,101 @@ def menu():
     network.add_area(area_5)
 
     # Add edges to the graph for shortest path calculation
-    for area in network.areas.values():
-        for router in area.routers.values():
-            for destination, next_hop in router.routing_table.items():
-                network.add_edge(router.name, next_hop)
+    network.add_weighted_edges_from(
+        (router.name, next_hop, 1)
+        for area in network.areas.values()
+        for router in area.routers.values()
+        for next_hop in router.routing_table.values()
+    )
+
+    network.finalize()
+    return network
+
+MENU_TEXT = "\n".join([
+    "\nMenu:",
+    "1. Shortest path",
+    "2. Tampilkan tabel hierarchical routing",
+    "3. Tambah Region",
+    "4. Hapus Region",
+    "5. Exit",
+])
+
+def do_shortest_path(network):
+    source = input("Masukkan router sumber: ")
+    destination = input("Masukkan router tujuan: ")
+    try:
+        path = network.shortest_path(source, destination)
+        print(f"Rute terpendek dari {source} ke {destination}: {' -> '.join(path)}")
+        network.visualize_network(path)
+    except nx.NetworkXNoPath:
+        print(f"Tidak ada rute dari {source} ke {destination}.")
+
+def do_print_routing_table(network):
+    router_name = input("Masukkan nama router: ")
+    network.print_routing_table(router_name)
+
+def do_add_region(network):
+    region_name = input("Masukkan nama region: ")
+    num_routers = int(input("Masukkan jumlah router dalam region: "))
+    new_area = Area(region_name)
+    for _ in range(num_routers):
+        router_name = input("Masukkan nama router: ")
+        new_router = Router(router_name)
+        num_routes = int(input(f"Masukkan jumlah rute untuk router {router_name}: "))
+        for _ in range(num_routes):
+            dest = input("Masukkan tujuan: ")
+            next_hop = input("Masukkan next hop: ")
+            new_router.add_route(dest, next_hop)
+        new_area.add_router(new_router)
+    network.add_area(new_area)
+    print(f"Region {region_name} ditambahkan.")
+    network.visualize_network()
+
+def do_remove_region(network):
+    region_name = input("Masukkan nama region yang akan dihapus: ")
+    network.remove_area(region_name)
+    print(f"Region {region_name} dihapus.")
+    network.visualize_network()
+
+MENU_HANDLERS = {
+    '1': do_shortest_path,
+    '2': do_print_routing_table,
+    '3': do_add_region,
+    '4': do_remove_region,
+}
+
+EXIT_CHOICE = '5'
+
+def menu(network=None):
+    if network is None:
+        network = build_network()
 
     while True:
-        print("\nMenu:")
-        print("1. Shortest path")
-        print("2. Tampilkan tabel hierarchical routing")
-        print("3. Tambah Region")
-        print("4. Hapus Region")
-        print("5. Exit")
+        print(MENU_TEXT)
         choice = input("Pilih opsi: ")
-
-        if choice == '1':
-            source = input("Masukkan router sumber: ")
-            destination = input("Masukkan router tujuan: ")
-            try:
-                path = network.shortest_path(source, destination)
-                print(f"Rute terpendek dari {source} ke {destination}: {' -> '.join(path)}")
-                network.visualize_network(path)
-            except nx.NetworkXNoPath:
-                print(f"Tidak ada rute dari {source} ke {destination}.")
-        elif choice == '2':
-            router_name = input("Masukkan nama router: ")
-            network.print_routing_table(router_name)
-        elif choice == '3':
-            region_name = input("Masukkan nama region: ")
-            num_routers = int(input("Masukkan jumlah router dalam region: "))
-            new_area = Area(region_name)
-            for _ in range(num_routers):
-                router_name = input("Masukkan nama router: ")
-                new_router = Router(router_name)
-                num_routes = int(input(f"Masukkan jumlah rute untuk router {router_name}: "))
-                for _ in range(num_routes):
-                    dest = input("Masukkan tujuan: ")
-                    next_hop = input("Masukkan next hop: ")
-                    new_router.add_route(dest, next_hop)
-                new_area.add_router(new_router)
-            network.add_area(new_area)
-            print(f"Region {region_name} ditambahkan.")
-            network.visualize_network()
-        elif choice == '4':
-            region_name = input("Masukkan nama region yang akan dihapus: ")
-            network.remove_area(region_name)
-            print(f"Region {region_name} dihapus.")
-            network.visualize_network()
-        elif choice == '5':
+        if choice == EXIT_CHOICE:
             break
-        else:
+        handler = MENU_HANDLERS.get(choice)
+        if handler is None:
             print("Pilihan tidak valid. Silakan coba lagi.")
+        else:
+            handler(network)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hierarchical routing simulator")
+    parser.add_argument("--script", metavar="FILE", help="apply the commands in FILE instead of showing the menu")
+    parser.add_argument("--headless", action="store_true", help="render with the Agg backend and save figures instead of showing them")
+    parser.add_argument("--output", metavar="FILE", default="hierarchical_routing.png", help="where --headless saves the figure (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.headless:
+        plt.switch_backend('Agg')
+    network = build_network(args.output if args.headless else None)
+
+    if args.script:
+        network.apply_script(args.script)
+    else:
+        menu(network)
 
 if __name__ == "__main__":
-    menu()
+    main()
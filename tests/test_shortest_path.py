@@ -0,0 +1,164 @@
+import importlib.util
+import os
+import random
+import unittest
+from unittest import mock
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import networkx as nx
+
+# The module's file name contains a space, so it cannot be imported by name
+MODULE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Hierarchical Routing.py")
+spec = importlib.util.spec_from_file_location("hierarchical_routing", MODULE_PATH)
+hr = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(hr)
+
+
+def path_weight(G, path):
+    return sum(G[u][v].get("weight", 1) for u, v in zip(path, path[1:]))
+
+
+def random_network(rng, weighted):
+    network = hr.Network()
+    n = rng.randint(1, 25)
+    for _ in range(rng.randint(0, 80)):
+        weight = rng.choice([1, 2, 3, 5]) if weighted else 1
+        network.add_edge(str(rng.randrange(n)), str(rng.randrange(n)), weight=weight)
+    return network
+
+
+class ShortestPathTest(unittest.TestCase):
+    def assert_matches_networkx(self, network, find_path, pairs):
+        for source, target in pairs:
+            try:
+                expected = nx.shortest_path_length(network.G, source, target, weight="weight")
+            except (nx.NodeNotFound, nx.NetworkXNoPath) as error:
+                with self.assertRaises(type(error)):
+                    find_path(source, target)
+                continue
+            path = find_path(source, target)
+            self.assertEqual(path[0], source)
+            self.assertEqual(path[-1], target)
+            self.assertTrue(all(network.G.has_edge(u, v) for u, v in zip(path, path[1:])))
+            self.assertEqual(path_weight(network.G, path), expected)
+
+    def random_pairs(self, rng, network):
+        nodes = list(network.G) + ["missing"]
+        return [(rng.choice(nodes), rng.choice(nodes)) for _ in range(20)]
+
+    def test_jit_kernel_matches_networkx_on_weighted_graphs(self):
+        rng = random.Random(1)
+        for _ in range(100):
+            network = random_network(rng, weighted=True)
+            self.assert_matches_networkx(network, network._jit_shortest_path, self.random_pairs(rng, network))
+
+    def test_jit_kernel_and_bfs_match_networkx_on_unit_graphs(self):
+        rng = random.Random(2)
+        for _ in range(100):
+            network = random_network(rng, weighted=False)
+            pairs = self.random_pairs(rng, network)
+            self.assert_matches_networkx(network, network._jit_shortest_path, pairs)
+            self.assert_matches_networkx(network, network._flat_shortest_path, pairs)
+
+    def test_reweighted_duplicate_edges_use_latest_weight(self):
+        network = hr.Network()
+        network.add_edge("a", "b", weight=1)
+        network.add_edge("b", "c", weight=1)
+        network.add_edge("a", "c", weight=5)
+        self.assertEqual(network._jit_shortest_path("a", "c"), ["a", "b", "c"])
+
+        network.add_edge("a", "b", weight=10)
+        network.add_weighted_edges_from([("a", "c", 7), ("a", "c", 2)])
+        self.assertEqual(network._jit_shortest_path("a", "c"), ["a", "c"])
+        self.assertEqual(network.adj["a"], ["b", "c"])
+
+    def test_missing_source_and_target(self):
+        network = hr.Network()
+        network.add_edge("a", "b", weight=2)
+        with self.assertRaises(nx.NodeNotFound):
+            network._jit_shortest_path("missing", "b")
+        with self.assertRaises(nx.NetworkXNoPath):
+            network._jit_shortest_path("a", "missing")
+        with self.assertRaises(nx.NetworkXNoPath):
+            network._jit_shortest_path("b", "a")
+
+
+def random_area_network(rng):
+    network = hr.Network()
+    names = []
+    for area_index in range(rng.randint(1, 4)):
+        area = hr.Area(f"Region {area_index}")
+        for router_index in range(rng.randint(1, 6)):
+            area.add_router(hr.Router(f"{area_index}{router_index}"))
+            names.append(f"{area_index}{router_index}")
+        network.add_area(area)
+    # Routers outside every area take part in the graph too
+    names += ["x", "y"]
+    weighted = rng.random() < 0.5
+    for _ in range(rng.randint(0, 50)):
+        weight = rng.choice([1, 2, 3]) if weighted else 1
+        network.add_edge(rng.choice(names), rng.choice(names), weight=weight)
+    return network
+
+
+class HierarchicalPathTest(unittest.TestCase):
+    def setUp(self):
+        # Force the overlay on for every graph, however small
+        for name, value in [("njit", None), ("HIERARCHY_MIN_ROUTERS", 0),
+                            ("HIERARCHY_MIN_ROUTERS_PER_BOUNDARY", 0), ("HIERARCHY_MIN_QUERIES", 1)]:
+            patcher = mock.patch.object(hr, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_matches_networkx_across_areas(self):
+        rng = random.Random(3)
+        hierarchical = 0
+        for _ in range(200):
+            network = random_area_network(rng)
+            for source in network.G:
+                for target in network.G:
+                    try:
+                        expected = nx.shortest_path_length(network.G, source, target, weight="weight")
+                    except nx.NetworkXNoPath:
+                        with self.assertRaises(nx.NetworkXNoPath):
+                            network._find_shortest_path(source, target)
+                        continue
+                    path = network._find_shortest_path(source, target)
+                    self.assertEqual((path[0], path[-1]), (source, target))
+                    self.assertTrue(all(network.G.has_edge(u, v) for u, v in zip(path, path[1:])))
+                    self.assertEqual(path_weight(network.G, path), expected)
+                    hierarchy = network._current_hierarchy()
+                    if hierarchy and hierarchy[0][source] != hierarchy[0][target]:
+                        hierarchical += 1
+        self.assertGreater(hierarchical, 0)
+
+    def test_route_may_leave_and_reenter_an_area(self):
+        network = hr.Network()
+        area_a = hr.Area("A")
+        for name in "axyb":
+            area_a.add_router(hr.Router(name))
+        area_b = hr.Area("B")
+        area_b.add_router(hr.Router("c"))
+        area_c = hr.Area("C")
+        area_c.add_router(hr.Router("d"))
+        for area in (area_a, area_b, area_c):
+            network.add_area(area)
+        for u, v in ["ac", "cb", "ax", "xy", "yb", "bd"]:
+            network.add_edge(u, v)
+        self.assertEqual(network._find_shortest_path("a", "d"), ["a", "c", "b", "d"])
+
+
+class HierarchyGateTest(unittest.TestCase):
+    def test_sample_network_uses_the_flat_search(self):
+        network = hr.build_network()
+        network.add_area_border_router(network.router_index["1C"][1], "Region 1")
+        for _ in range(hr.HIERARCHY_MIN_QUERIES + 1):
+            network._find_shortest_path("1A", "3B")
+        self.assertIsNone(network._current_hierarchy())
+
+
+if __name__ == "__main__":
+    unittest.main()